@@ -17,6 +17,7 @@ def main():
     parser.add_argument("spec_file", help="Path to QDIMACS specification file")
     parser.add_argument("--samples", type=int, default=500, help="Number of training samples")
     parser.add_argument("--iterations", type=int, default=50, help="Max repair iterations")
+    parser.add_argument("--jobs", type=int, default=-1, help="Parallel jobs for labeling and learning (-1 = all cores)")
     
     # Topology sort toggle
     parser.add_argument("--topo-sort", action="store_true", default=True, help="Enable topological sort of output variables (Default)")
@@ -41,13 +42,13 @@ def main():
     
     # Phase 2: Sampling
     logger.info(f"Starting Phase 2: Sampling ({args.samples} samples)")
-    sampler = OracleSampler(qparser.get_cnf(), input_vars, output_vars)
+    sampler = OracleSampler(qparser.clauses, input_vars, output_vars, n_jobs=args.jobs)
     # samples_data contains the full trace (X + Y)
     samples_data, labels_Y = sampler.generate_samples(args.samples)
     
     # Phase 3: Learning
     logger.info("Starting Phase 3: Learning Initial Basis")
-    learner = BasisLearner(input_vars, output_vars)
+    learner = BasisLearner(input_vars, output_vars, n_jobs=args.jobs)
     # Pass full samples_data so learner can extract Y_{<i} features
     candidates = learner.learn(samples_data, labels_Y)
     
@@ -1,4 +1,5 @@
 import logging
+from joblib import Parallel, delayed
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.tree import _tree
 from src.utils import SymbolicBasis
@@ -11,85 +12,111 @@ class BasisLearner:
     Learns symbolic approximations (A_i, C_i) for each variable
     using Decision Trees.
     """
-    def __init__(self, input_vars, output_vars):
+    def __init__(self, input_vars, output_vars, n_jobs=None):
         self.input_vars = input_vars
         self.output_vars = output_vars
+        # Number of parallel tree-training jobs (joblib semantics: -1 = all cores)
+        self.n_jobs = n_jobs
         
     def learn(self, samples_data, labels_Y):
         """
         Train trees and extract formulas.
-        samples_data: List of dicts {var_id: 0/1}
-        labels_Y: Dict {var_id: [labels...]}
+        samples_data: uint8 array [num_samples, |X| + |Y|], columns ordered as input_vars + output_vars
+        labels_Y: uint8 array [num_samples, |Y|], columns ordered as output_vars
         
         Returns dict: {y_var: {'A': SymbolicBasis, 'C': SymbolicBasis}}
         """
         logger.info("Starting Decision Tree learning phase with dependencies...")
         candidates = {}
         
-        # We iterate in topological order (as preserved in self.output_vars)
-        for i, y_var in enumerate(self.output_vars):
-            y_labels = np.array(labels_Y[y_var])
-            
-            # Dynamic Feature Selection: X + Y_{<i}
-            # These are the allowed dependencies for y_i
-            previous_y = self.output_vars[:i]
-            feature_vars = self.input_vars + previous_y
-            
-            # Construct Feature Matrix X_mat for this specific variable
-            # Dimensions: [num_samples, len(feature_vars)]
-            X_mat = []
-            for sample in samples_data:
-                row = [sample[v] for v in feature_vars]
-                X_mat.append(row)
-            
-            X_mat = np.array(X_mat)
-            
-            logger.debug(f"Training for y_{y_var} (Idx: {i}). Features: |X|={len(self.input_vars)} + |Y<i|={len(previous_y)}. Matrix: {X_mat.shape}")
-            
-            clf = DecisionTreeClassifier(
-                class_weight='balanced', 
-                max_depth=10, 
-                random_state=42
-            )
-            clf.fit(X_mat, y_labels)
-            
-            # Extract A (Must-1, Class 1) and C (Must-0, Class 2)
-            A_basis = SymbolicBasis(f"A_{y_var}")
-            C_basis = SymbolicBasis(f"C_{y_var}")
-            
-            # Note: We pass the specific feature_vars used for this tree
-            self._extract_paths(clf, feature_vars, 1, A_basis)
-            self._extract_paths(clf, feature_vars, 2, C_basis)
-            
+        # The sampler already provides the full sample matrix: one column per variable (X + Y)
+        # Dimensions: [num_samples, |X| + |Y|]
+        # Cast once to the tree's internal float32 so fit() does not copy per tree
+        X_full = samples_data.astype(np.float32, copy=False)
+        
+        # Each tree only reads its own columns of the (already complete) sample
+        # matrix, so the trees are independent and can be trained concurrently.
+        # joblib memmaps X_full to the workers instead of copying it per task.
+        results = Parallel(n_jobs=self.n_jobs, backend='loky')(
+            delayed(self._train_one)(i, y_var, X_full, labels_Y[:, i])
+            for i, y_var in enumerate(self.output_vars)
+        )
+        
+        # Results come back in topological order (as preserved in self.output_vars)
+        for y_var, A_basis, C_basis in results:
             logger.debug(f"  y_{y_var}: Extracted {len(A_basis.cubes)} cubes for A, {len(C_basis.cubes)} cubes for C.")
-            
             candidates[y_var] = {'A': A_basis, 'C': C_basis}
             
         logger.info("Learning phase complete.")
         return candidates
 
-    def _extract_paths(self, tree, feature_vars, target_class, basis):
+    def _train_one(self, i, y_var, X_full, y_labels):
+        """
+        Trains the tree for the i-th output variable and extracts its bases.
+        Returns: (y_var, A_basis, C_basis)
         """
-        Traverses the tree and adds paths leading to target_class to the basis DNF.
+        # Dynamic Feature Selection: X + Y_{<i}
+        # These are the allowed dependencies for y_i
+        previous_y = self.output_vars[:i]
+        feature_vars = self.input_vars + previous_y
+        
+        # X_full's columns follow input_vars + output_vars, so the features of y_i
+        # are exactly its first len(feature_vars) columns: a view, not a copy.
+        # Dimensions: [num_samples, len(feature_vars)]
+        X_mat = X_full[:, :len(feature_vars)]
+        
+        logger.debug(f"Training for y_{y_var} (Idx: {i}). Features: |X|={len(self.input_vars)} + |Y<i|={len(previous_y)}. Matrix: {X_mat.shape}")
+        
+        # Every feature is Boolean, so each one has a single candidate threshold;
+        # min_samples_leaf=2 stops splits that only isolate a single sample.
+        clf = DecisionTreeClassifier(
+            class_weight='balanced', 
+            max_depth=10, 
+            min_samples_leaf=2,
+            max_features=None,
+            random_state=42
+        )
+        clf.fit(X_mat, y_labels)
+        
+        # Extract A (Must-1, Class 1) and C (Must-0, Class 2)
+        A_basis = SymbolicBasis(f"A_{y_var}")
+        C_basis = SymbolicBasis(f"C_{y_var}")
+        
+        # Note: We pass the specific feature_vars used for this tree
+        self._extract_paths(clf, feature_vars, {1: A_basis, 2: C_basis})
+        
+        return y_var, A_basis, C_basis
+
+    def _extract_paths(self, tree, feature_vars, class_to_basis):
+        """
+        Traverses the tree once and adds each root-to-leaf path to the basis DNF
+        registered for the leaf's predicted class (other leaves are ignored).
         feature_vars: List of variable IDs corresponding to the tree's features columns.
+        class_to_basis: Dict {class_label: SymbolicBasis}
         """
         tree_ = tree.tree_
+        feature = tree_.feature
+        children_left = tree_.children_left
+        children_right = tree_.children_right
+        
+        # Predicted label of every node, mapped through classes_ since the
+        # argmax is an index into the classes actually seen during fit
+        leaf_class = tree.classes_[tree_.value[:, 0, :].argmax(axis=1)]
         
-        def recurse(node, path):
-            if tree_.feature[node] != -2:
+        stack = [(0, [])]
+        while stack:
+            node, path = stack.pop()
+            if feature[node] != _tree.TREE_UNDEFINED:
                 # Map internal feature index to actual variable ID
-                feature_idx = tree_.feature[node]
-                var_id = feature_vars[feature_idx]
-                
-                # Left Child (<= 0.5 -> Value 0) -> Literal is -var_id
-                recurse(tree_.children_left[node], path + [-var_id])
+                var_id = feature_vars[feature[node]]
                 
                 # Right Child (> 0.5 -> Value 1) -> Literal is var_id
-                recurse(tree_.children_right[node], path + [var_id])
+                stack.append((children_right[node], path + [var_id]))
+                
+                # Left Child (<= 0.5 -> Value 0) -> Literal is -var_id
+                stack.append((children_left[node], path + [-var_id]))
             else:
                 # Leaf
-                predicted_class = np.argmax(tree_.value[node])
-                if predicted_class == target_class:
+                basis = class_to_basis.get(leaf_class[node])
+                if basis is not None:
                     basis.add_cube(path)
-                    
-        recurse(0, [])
\ No newline at end of file
@@ -3,6 +3,7 @@ import subprocess
 import os
 from pysat.examples.rc2 import RC2
 from pysat.formula import WCNF
+from src.utils import dense_assignment
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +29,10 @@ class Verifier:
         self.num_orig_vars = parser.num_vars
         self.abc_path = "./dependencies/abc/file_generation_cex"
         
+        # Verilog text per basis wire, reused while the basis version is unchanged:
+        # {wire_prefix: (basis, version, text)}
+        self._basis_logic_cache = {}
+        
     def verify(self, candidates, g_vars_map):
         """
         Checks E = F(X,Y) ^ !F(X,Y') ^ (Y' <-> Psi(X,G))
@@ -122,8 +127,8 @@ class Verifier:
             # 3. Internal Logic (Synthesis candidates)
             for y in self.output_vars:
                 cand = candidates[y]
-                f.write(self._verilog_basis_logic(cand['A'], f"a_{y}"))
-                f.write(self._verilog_basis_logic(cand['C'], f"c_{y}"))
+                f.write(self._cached_basis_logic(cand['A'], f"a_{y}"))
+                f.write(self._cached_basis_logic(cand['C'], f"c_{y}"))
                 
                 # Logic: y_syn = A | (G & ~C)
                 f.write(f"  wire y_syn_{y};\n")
@@ -192,6 +197,17 @@ class Verifier:
                 
             f.write("endmodule\n")
 
+    def _cached_basis_logic(self, basis, wire_prefix):
+        """
+        Returns _verilog_basis_logic(basis, wire_prefix), re-encoding only the bases
+        that changed since the last verification (repairs are localized).
+        """
+        entry = self._basis_logic_cache.get(wire_prefix)
+        if entry is None or entry[0] is not basis or entry[1] != basis.version:
+            entry = (basis, basis.version, self._verilog_basis_logic(basis, wire_prefix))
+            self._basis_logic_cache[wire_prefix] = entry
+        return entry[2]
+
     def _verilog_basis_logic(self, basis, wire_prefix):
         """
         Converts SymbolicBasis (cubes/clauses) to Verilog assignment.
@@ -295,7 +311,8 @@ class Verifier:
         """
         cex_Y_prime = {}
         
-        current_assignment = cex_X.copy()
+        # Dense view, converted once and shared by every evaluate() below
+        current_assignment = dense_assignment(cex_X, max(self.output_vars, default=0))
         
         for y in self.output_vars:
             cand = candidates[y]
@@ -308,7 +325,7 @@ class Verifier:
             y_val = a_val or (g_val and not c_val)
             
             cex_Y_prime[y] = y_val
-            current_assignment[y] = y_val
+            current_assignment[y] = 1 if y_val else -1
             
         return cex_Y_prime
 
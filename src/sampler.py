@@ -1,9 +1,15 @@
 import pycmsgen
 import logging
+import numpy as np
+from joblib import effective_n_jobs
+from multiprocessing import Pool
 from pysat.solvers import Glucose3
 
 logger = logging.getLogger(__name__)
 
+# Per-process oracle state for the labeling worker pool (see _init_worker)
+_worker_state = None
+
 class OracleSampler:
     """
     Generates training data for the Skolem functions.
@@ -12,11 +18,22 @@ class OracleSampler:
     1. Generator: Uses pycmsgen to produce high-quality, uniform-like satisfying assignments.
     2. Oracle: Uses Glucose3 to perform the 'Poly-Check' (labeling Must-1/Must-0/Don't-Care)
        by checking the satisfiability of alternate values under the current prefix.
+       With n_jobs > 1 the Poly-Check is spread over a process pool, where every
+       worker owns its own bootstrapped Glucose3 instance.
     """
-    def __init__(self, cnf, input_vars, output_vars):
-        self.cnf = cnf
+    def __init__(self, clauses, input_vars, output_vars, n_jobs=1):
+        # The specification matrix as a list of clauses (lists of literals). The same
+        # list is handed to both solvers; no CNF copy is built.
+        self.clauses = clauses
         self.input_vars = input_vars
         self.output_vars = output_vars
+        # Number of labeling processes (joblib semantics: -1 = all cores, -2 = all but one, ...)
+        self.n_jobs = effective_n_jobs(n_jobs)
+        
+        # Variable ids as index arrays into a per-sample polarity array (see _polarity)
+        self._input_arr = np.array(input_vars, dtype=np.intp)
+        self._output_arr = np.array(output_vars, dtype=np.intp)
+        self._num_vars = max(input_vars + output_vars, default=0)
         
         logger.debug(f"Initializing OracleSampler with {len(input_vars)} inputs, {len(output_vars)} outputs.")
         
@@ -24,88 +41,187 @@ class OracleSampler:
         self.sampler = pycmsgen.Solver()
         
         # Load clauses into pycmsgen (supports bulk addition)
-        if cnf.clauses:
-            self.sampler.add_clauses(cnf.clauses)
-            logger.debug(f"Loaded {len(cnf.clauses)} clauses into pycmsgen.")
+        if clauses:
+            self.sampler.add_clauses(clauses)
+            logger.debug(f"Loaded {len(clauses)} clauses into pycmsgen.")
             
-        # --- 2. Initialize Oracle (Glucose3) ---
-        self.oracle = Glucose3(bootstrap_with=cnf.clauses)
+        # --- 2. Oracle (Glucose3) ---
+        # Built on first in-process use (see the oracle property): when labeling
+        # runs in the worker pool, each worker bootstraps its own instead.
+        self._oracle = None
+        
+        # --- 3. Oracle Cache ---
+        # The label of y_i depends only on the prefix X ∪ Y_{<i}, so it is
+        # memoized across samples: {prefix_id: label}. Each distinct prefix is
+        # interned to an integer id through (parent_id, literal) keys, so the
+        # key grows with the prefix in O(1) instead of re-hashing it per y_i.
+        self._prefix_ids = {}
+        self._label_cache = {}
+
+    @property
+    def oracle(self):
+        """The main-process Glucose3 oracle, bootstrapped with the clauses on first access."""
+        if self._oracle is None:
+            self._oracle = Glucose3(bootstrap_with=self.clauses)
+        return self._oracle
 
     def generate_samples(self, num_samples):
         """
         Generates labeled samples for each output variable.
         Returns: 
-            samples_data: List of dicts {var_id: value (0/1)} containing full assignment (X and Y).
-            labels_Y: Dict {var_idx: [label_1, label_2, ...]}
+            samples_data: uint8 array [num_samples, |X| + |Y|] with the full assignment (X and Y),
+                          columns ordered as input_vars + output_vars.
+            labels_Y: uint8 array [num_samples, |Y|], columns ordered as output_vars.
             
         Labels:
             0: Don't-Care (Both 0 and 1 are valid given prefix)
             1: Must-1     (0 is UNSAT given prefix)
             2: Must-0     (1 is UNSAT given prefix)
         """
-        samples_data = []
-        labels_Y = {v: [] for v in self.output_vars}
-        
-        generated_count = 0
         logger.info(f"Starting sample generation. Target: {num_samples}")
         
-        while generated_count < num_samples:
-            # 1. Generate a valid satisfying assignment (Sample)
-            found = self.sampler.solve()
-            
-            if not found:
-                logger.warning("Sampler returned False. Spec might be UNSAT or exhausted.")
-                break
+        # 1. Generate valid satisfying assignments (Samples)
+        models = self._draw_models(num_samples)
+        
+        # Preallocated, contiguous sample buffers filled row by row
+        samples_data = np.empty((len(models), len(self.input_vars) + len(self.output_vars)), dtype=np.uint8)
+        labels_Y = np.empty((len(models), len(self.output_vars)), dtype=np.uint8)
+        
+        # 2. Labeling (The "Poly-Check"), independent per sample
+        if self.n_jobs > 1 and len(models) > 1:
+            with Pool(
+                processes=self.n_jobs,
+                initializer=_init_worker,
+                initargs=(self.clauses, self._input_arr, self._output_arr, self._num_vars)
+            ) as pool:
+                chunksize = max(1, len(models) // (4 * self.n_jobs))
+                labeled = pool.imap(_label_in_worker, models, chunksize=chunksize)
+                self._collect(models, labeled, samples_data, labels_Y)
+        else:
+            labeled = (
+                _label_model(self.oracle, self._prefix_ids, self._label_cache,
+                             model, self._num_vars, self._input_arr, self._output_arr)
+                for model in models
+            )
+            self._collect(models, labeled, samples_data, labels_Y)
+        
+        logger.info(f"Finished sampling. Total samples: {len(samples_data)}")
+        return samples_data, labels_Y
+
+    def _draw_models(self, num_samples, batch_size=50):
+        """
+        Draws up to num_samples models from the (warm) pycmsgen solver.
+        pycmsgen has no multi-sample call, so models are requested back to back
+        on the same solver and reported per batch of batch_size.
+        Returns: List of models (lists of literals).
+        """
+        models = []
+        while len(models) < num_samples:
+            for _ in range(min(batch_size, num_samples - len(models))):
+                # solve() returns (sat, solution), never a bare bool
+                found, _solution = self.sampler.solve()
                 
-            model = self.sampler.get_model()
-            
-            # Map literals to values for O(1) lookup
-            sample_map = {abs(l): l for l in model}
-            
-            # Store full assignment (X and Y) for feature construction later
-            # We map variable ID -> 0/1 integer
-            current_sample = {}
-            for v in self.input_vars + self.output_vars:
-                 val = 1 if sample_map.get(v, -v) > 0 else 0
-                 current_sample[v] = val
+                if not found:
+                    logger.warning("Sampler returned False. Spec might be UNSAT or exhausted.")
+                    return models
+                    
+                models.append(self.sampler.get_model())
+                
+            logger.debug(f"Drew {len(models)}/{num_samples} models from pycmsgen.")
             
-            samples_data.append(current_sample)
+        return models
+
+    def _collect(self, models, labeled, samples_data, labels_Y):
+        """Writes each model's (row, labels) pair from _label_model into row i."""
+        for i, (row, labels) in enumerate(labeled):
+            samples_data[i] = row
+            labels_Y[i] = labels
             
-            # 2. Labeling (The "Poly-Check")
-            # For each output y_i, check if its value was "forced" by the prefix.
-            for i, y_var in enumerate(self.output_vars):
-                prefix_lits = []
-                
-                # Add X assumptions
-                for x in self.input_vars:
-                    prefix_lits.append(sample_map.get(x, -x))
-                
-                # Add Y_{<i} assumptions
-                for prev_y in self.output_vars[:i]:
-                    prefix_lits.append(sample_map.get(prev_y, -prev_y))
-                
+            if (i + 1) % 50 == 0:
+                logger.info(f"Labeled {i + 1}/{len(models)} samples.")
+
+def _polarity(model, num_vars):
+    """
+    Literal of every variable id under model, as an int32 array indexed by id.
+    Variables missing from the model read as their negative literal.
+    """
+    model_arr = np.fromiter(model, dtype=np.int32)
+    size = max(num_vars, int(np.abs(model_arr).max(initial=0))) + 1
+    polarity = -np.arange(size, dtype=np.int32)
+    polarity[np.abs(model_arr)] = model_arr
+    return polarity
+
+def _label_model(oracle, prefix_ids, label_cache, model, num_vars, input_arr, output_arr):
+    """
+    Builds the model's polarity array once and derives both outputs from it.
+    Returns: (row, labels), row being the 0/1 value of every input, then output,
+             variable (unassigned variables read as 0) and labels as of _poly_check.
+    """
+    polarity = _polarity(model, num_vars)
+    row = np.concatenate([polarity[input_arr], polarity[output_arr]]) > 0
+    return row, _poly_check(oracle, prefix_ids, label_cache, polarity, input_arr, output_arr)
+
+def _poly_check(oracle, prefix_ids, label_cache, polarity, input_arr, output_arr):
+    """
+    Labels every output of one sample. For each output y_i, checks if its value
+    was "forced" by the prefix X ∪ Y_{<i}.
+    polarity: The sample's literal per variable id (see _polarity).
+    Returns: List of labels, aligned with output_arr.
+    """
+    labels = []
+    x_lits = polarity[input_arr].tolist()
+    y_lits = polarity[output_arr].tolist()
+    
+    # The prefix grows in place: X first, then one Y_{<i} literal per step
+    prefix_lits = list(x_lits)
+    prefix_id = 0
+    
+    # Add X assumptions
+    for lit in x_lits:
+        prefix_id = _extend_prefix(prefix_ids, prefix_id, lit)
+    
+    for i, y_lit in enumerate(y_lits):
+        if i > 0:
+            # Add Y_{<i} assumptions
+            lit = y_lits[i - 1]
+            prefix_lits.append(lit)
+            prefix_id = _extend_prefix(prefix_ids, prefix_id, lit)
+        
+        label = label_cache.get(prefix_id)
+        
+        if label is None:
+            # The sample itself witnesses its own value of y_i under the prefix,
+            # so only the opposite polarity needs an oracle call.
+            y_var = abs(y_lit)
+            if y_lit > 0:
                 # Check 0: Is F(P, y_i=0) SAT?
-                can_be_zero = self.oracle.solve(assumptions=prefix_lits + [-y_var])
-                
+                can_be_zero = oracle.solve(assumptions=prefix_lits + [-y_var])
+                label = 0 if can_be_zero else 1 # Don't Care / Must-1
+            else:
                 # Check 1: Is F(P, y_i=1) SAT?
-                can_be_one = self.oracle.solve(assumptions=prefix_lits + [y_var])
-                
-                label = 0 # Default: Don't Care
-                
-                if can_be_zero and can_be_one:
-                    label = 0 # Don't Care
-                elif not can_be_zero and can_be_one:
-                    label = 1 # Must-1
-                elif can_be_zero and not can_be_one:
-                    label = 2 # Must-0
-                else:
-                    label = 0 
-                
-                labels_Y[y_var].append(label)
-            
-            generated_count += 1
-            if generated_count % 50 == 0:
-                logger.info(f"Generated {generated_count}/{num_samples} samples.")
+                can_be_one = oracle.solve(assumptions=prefix_lits + [y_var])
+                label = 0 if can_be_one else 2 # Don't Care / Must-0
             
-        logger.info(f"Finished sampling. Total samples: {len(samples_data)}")
-        return samples_data, labels_Y
\ No newline at end of file
+            label_cache[prefix_id] = label
+        
+        labels.append(label)
+    
+    return labels
+
+def _extend_prefix(prefix_ids, prefix_id, lit):
+    """Returns the interned id of the prefix `prefix_id` extended by `lit`."""
+    key = (prefix_id, lit)
+    next_id = prefix_ids.get(key)
+    if next_id is None:
+        next_id = len(prefix_ids) + 1
+        prefix_ids[key] = next_id
+    return next_id
+
+def _init_worker(clauses, input_arr, output_arr, num_vars):
+    """Pool initializer: every worker owns its Glucose3 oracle and label cache."""
+    global _worker_state
+    _worker_state = (Glucose3(bootstrap_with=clauses), {}, {}, input_arr, output_arr, num_vars)
+
+def _label_in_worker(model):
+    oracle, prefix_ids, label_cache, input_arr, output_arr, num_vars = _worker_state
+    return _label_model(oracle, prefix_ids, label_cache, model, num_vars, input_arr, output_arr)
\ No newline at end of file
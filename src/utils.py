@@ -1,7 +1,17 @@
 import logging
-import collections
+import contextlib
+import mmap
+import os
+import re
+from array import array
+import numpy as np
 from pysat.formula import CNF
 
+try:
+    from numba import njit
+except ImportError: # numba is optional; SymbolicBasis falls back to the bitmask evaluator
+    njit = None
+
 logger = logging.getLogger(__name__)
 
 class QDIMACSParser:
@@ -11,48 +21,82 @@ class QDIMACSParser:
         self.num_vars = 0
         self.num_clauses = 0
         self.universals = set()
-        self.existentials = [] # Ordered list from file
+        self.existentials = {} # File order as dict keys (ordered, O(1) membership)
         self.clauses = []
+        self._clause_lits = np.zeros(0, dtype=np.int32)
+        self._clause_offsets = np.zeros(1, dtype=np.int64)
         self._parse()
 
     def _parse(self):
         logger.info(f"Parsing QDIMACS file: {self.filepath}")
-        with open(self.filepath, 'r') as f:
-            lines = f.readlines()
+        with open(self.filepath, 'rb') as f:
+            # Memory-map the file and walk it as bytes (an empty file cannot be mapped)
+            mapped = os.fstat(f.fileno()).st_size > 0
+            with (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if mapped
+                  else contextlib.nullcontext(b'')) as data:
+                # 1. Header: comments, problem line and quantifier blocks precede the clauses.
+                # Lines are located with find(b'\n'); only header lines are sliced out.
+                pos = 0
+                while pos < len(data):
+                    nl = data.find(b'\n', pos)
+                    if nl == -1:
+                        nl = len(data)
+                    line = data[pos:nl]
+                    
+                    first = line[:1] if line[:1] == b'c' else line.lstrip()[:1]
+                    if first and first not in b'cpae':
+                        break
+                    pos = nl + 1
+                    
+                    if not first or first == b'c':
+                        continue
+                    
+                    parts = line.split()
+                    head = parts[0]
+                    if head == b'p' and parts[1:2] == [b'cnf']:
+                        self.num_vars = int(parts[2])
+                        self.num_clauses = int(parts[3])
+                        logger.debug(f"Header found: {self.num_vars} vars, {self.num_clauses} clauses")
+                    elif first in b'ae':
+                        vars_ = [int(x) for x in parts[1:] if x != b'0']
+                        if head == b'a':
+                            self.universals.update(vars_)
+                        else:
+                            self.existentials.update(dict.fromkeys(vars_))
+                
+                # The clause block is copied out of the map once, undecoded
+                body = data[pos:]
         
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('c'):
-                continue
-            
-            if line.startswith('p cnf'):
-                parts = line.split()
-                self.num_vars = int(parts[2])
-                self.num_clauses = int(parts[3])
-                logger.debug(f"Header found: {self.num_vars} vars, {self.num_clauses} clauses")
-                continue
-            
-            if line.startswith('a') or line.startswith('e'):
-                quant = line.split()[0]
-                vars_ = [int(x) for x in line.split()[1:] if x != '0']
-                if quant == 'a':
-                    self.universals.update(vars_)
-                else:
-                    self.existentials.extend(vars_)
-                continue
-            
-            # Clause
-            lits = [int(x) for x in line.split() if x != '0']
-            if lits:
-                self.clauses.append(lits)
+        # 2. Clause block: tokenized in bulk by NumPy, then split on the 0 terminators
+        if re.search(rb'(?m)^\s*c', body):
+            body = b'\n'.join(l for l in body.splitlines() if not l.lstrip().startswith(b'c'))
+        
+        lits = np.fromstring(body, dtype=np.int32, sep=' ')
+        zeros = np.flatnonzero(lits == 0)
+        lengths = np.diff(np.concatenate([[-1], zeros, [len(lits)]])) - 1
+        
+        # Flat int32 (CSR) copy of the matrix: clause k spans
+        # _clause_lits[_clause_offsets[k]:_clause_offsets[k+1]], empty clauses dropped
+        self._clause_lits = lits[lits != 0]
+        self._clause_offsets = np.concatenate([[0], np.cumsum(lengths[lengths > 0])])
+        
+        # Convert to Python lists only here, at the boundary with the solvers
+        flat = self._clause_lits.tolist()
+        offsets = self._clause_offsets.tolist()
+        # Identical clauses (up to literal order) are interned under a sorted key:
+        # every repeat refers to the first list object seen for that key.
+        # The count is unchanged (the solvers receive each occurrence as before).
+        pool = {}
+        self.clauses = [pool.setdefault(tuple(sorted(c := flat[a:b])), c) for a, b in zip(offsets, offsets[1:])]
+        if len(pool) < len(self.clauses):
+            logger.debug(f"Interned {len(self.clauses) - len(pool)} duplicate clauses.")
         
         logger.info(f"Parsed {len(self.universals)} universal and {len(self.existentials)} existential variables.")
 
     def get_cnf(self):
-        cnf = CNF()
-        for c in self.clauses:
-            cnf.append(c)
-        return cnf
+        # By reference: the clause lists are shared, as with the old append loop
+        # (only the outer list is copied, so appending to the CNF leaves self.clauses alone)
+        return CNF(from_clauses=list(self.clauses), by_ref=True)
 
     def get_dependency_order(self):
         """
@@ -60,62 +104,125 @@ class QDIMACSParser:
         clause connectivity to universal variables.
         
         Method:
-        1. Build Variable Interaction Graph (VIG) where edge (u,v) exists if they appear in same clause.
+        1. Build Variable Interaction Graph (VIG) where edge (u,v) exists if they appear in same clause,
+           stored as var <-> clause incidences.
         2. Perform BFS starting from Universal variables (X) to find 'closest' Existentials (Y).
         3. Append any disconnected components.
         """
         logger.info("Computing topological dependency order...")
         
-        # 1. Build Adjacency Graph
-        # Note: We track connections for all variables.
-        adj = collections.defaultdict(set)
-        for cl in self.clauses:
-            # We don't need full clique; just connecting adjacent lits in list is NOT enough.
-            # We need full clique for the clause? 
-            # Optimization: Just connect all vars in clause to each other.
-            # For short clauses this is fine.
-            vars_in_clause = [abs(l) for l in cl]
-            for i in range(len(vars_in_clause)):
-                u = vars_in_clause[i]
-                for j in range(i + 1, len(vars_in_clause)):
-                    v = vars_in_clause[j]
-                    adj[u].add(v)
-                    adj[v].add(u)
+        # Common trivial cases where the BFS would return the file order anyway:
+        # at most one existential, or no clauses connecting any variables
+        if len(self.existentials) <= 1 or len(self._clause_lits) == 0:
+            order = list(self.existentials)
+            logger.debug(f"Computed order: {order}")
+            return order
+        
+        # 1. Build the VIG as a bipartite var <-> clause incidence list instead of
+        # expanding every clause into a clique: Σk entries rather than Σk² edges.
+        # clause -> vars: the flat CSR matrix; var -> clauses: the same entries
+        # grouped by variable (stable sort, so each group is in clause order).
+        num_clauses = len(self._clause_offsets) - 1
+        clause_vars = np.abs(self._clause_lits)
+        clause_ids = np.repeat(np.arange(num_clauses), np.diff(self._clause_offsets))
+        size = max(self.num_vars, int(clause_vars.max(initial=0)),
+                   max(self.universals, default=0), max(self.existentials, default=0)) + 1
+        
+        # Each variable enters a clause once: (clause, var) pairs are deduplicated
+        # via one sort of clause * size + var. A repeated pair (x ∨ x, x ∨ ¬x) is
+        # remembered as a self-loop, which the clique VIG had for such a variable.
+        pairs = np.sort(clause_ids * size + clause_vars)
+        keep = np.ones(len(pairs), dtype=bool)
+        keep[1:] = pairs[1:] != pairs[:-1]
+        self_loop = np.zeros(size, dtype=bool)
+        self_loop[pairs[~keep] % size] = True
+        pairs = pairs[keep]
+        clause_ids = pairs // size
+        clause_vars = pairs % size
+        clause_offsets = np.concatenate([[0], np.cumsum(np.bincount(clause_ids, minlength=num_clauses))])
+        
+        var_clauses_arr = clause_ids[np.argsort(clause_vars, kind='stable')]
+        var_offsets_arr = np.concatenate([[0], np.cumsum(np.bincount(clause_vars, minlength=size))])
+        var_clauses = var_clauses_arr.tolist()
+        var_offsets = var_offsets_arr.tolist()
+        clause_flat = clause_vars.tolist()
+        offsets = clause_offsets.tolist()
+        
+        def degrees():
+            """Number of distinct VIG neighbors of every variable id, as an array."""
+            # One (u, v) pair per variable v of every clause of u, self pairs included
+            lens = np.diff(clause_offsets)
+            reps = lens[clause_ids]
+            starts = np.repeat(clause_offsets[clause_ids], reps)
+            within = np.arange(reps.sum()) - np.repeat(np.cumsum(reps) - reps, reps)
+            pairs = np.unique(np.repeat(clause_vars, reps) * size + clause_vars[starts + within])
+            deg = np.bincount(pairs // size, minlength=size)
+            # u is its own neighbor only if it occurs twice in one clause
+            return deg - ((deg > 0) & ~self_loop)
                     
         # 2. BFS Initialization
+        # Variable ids are dense, so visited / existential membership are byte
+        # flags indexed by id, and the queue is a plain list consumed by an index.
         order = []
-        visited = set(self.universals) # Mark inputs as visited
-        queue = collections.deque(sorted(list(self.universals)))
+        visited = bytearray(size)
+        for x in self.universals: # Mark inputs as visited
+            visited[x] = 1
+        queue = sorted(self.universals)
+        head = 0
         
         # If no universals (SAT problem), pick a heuristic start node
         if not queue and self.existentials:
              # Heuristic: Start with variable having highest degree (most constrained)
-             start_node = max(self.existentials, key=lambda x: len(adj[x]))
-             visited.add(start_node)
-             if start_node in self.existentials:
-                 order.append(start_node)
+             ex = np.fromiter(self.existentials, dtype=np.int64)
+             start_node = int(ex[np.argmax(degrees()[ex])])
+             visited[start_node] = 1
+             order.append(start_node)
              queue.append(start_node)
 
         # 3. BFS Traversal
-        existential_set = set(self.existentials)
+        is_existential = bytearray(size)
+        for y in self.existentials:
+            is_existential[y] = 1
+        # Existentials still to be ordered. Usually every existential shares a clause
+        # with some universal and is found while the universals are popped; the BFS
+        # stops there instead of walking the rest of the graph.
+        pending = sum(not visited[y] for y in self.existentials)
+        
+        if njit is not None and pending:
+            # Same traversal in the numba-compiled kernel over the CSR arrays
+            queue_arr = np.zeros(size, dtype=np.int64)
+            queue_arr[:len(queue)] = queue
+            visited_arr = np.frombuffer(visited, dtype=np.uint8)
+            found = _bfs_flat(var_offsets_arr, var_clauses_arr, clause_offsets, clause_vars,
+                              queue_arr, len(queue), visited_arr,
+                              np.frombuffer(is_existential, dtype=np.uint8), pending)
+            order.extend(found.tolist())
+            pending = 0
         
-        while queue:
-            u = queue.popleft()
+        while pending and head < len(queue):
+            u = queue[head]
+            head += 1
             
-            # Get neighbors in specific order (e.g. numerical) for determinism
-            neighbors = sorted(list(adj[u]))
+            # Collect the unvisited neighbors of u, marking them as they are found
+            found = []
+            for ci in var_clauses[var_offsets[u]:var_offsets[u + 1]]:
+                for v in clause_flat[offsets[ci]:offsets[ci + 1]]:
+                    if not visited[v]:
+                        visited[v] = 1
+                        found.append(v)
             
-            for v in neighbors:
-                if v not in visited:
-                    visited.add(v)
-                    queue.append(v)
-                    if v in existential_set:
-                        order.append(v)
+            # Enqueue them in specific order (e.g. numerical) for determinism
+            found.sort()
+            queue.extend(found)
+            for v in found:
+                if is_existential[v]:
+                    order.append(v)
+                    pending -= 1
         
         # 4. Handle Disconnected Components
         # Append remaining existentials that weren't reached (unconstrained by X or main component)
         # We preserve their relative file order as a fallback.
-        remaining = [y for y in self.existentials if y not in visited]
+        remaining = [y for y in self.existentials if not visited[y]]
         if remaining:
             logger.info(f"Appending {len(remaining)} disconnected variables to order.")
             order.extend(remaining)
@@ -123,6 +230,90 @@ class QDIMACSParser:
         logger.debug(f"Computed order: {order}")
         return order
 
+def _bfs_flat(var_offsets, var_clauses, clause_offsets, clause_vars, queue, tail, visited, is_existential, pending):
+    """
+    BFS of get_dependency_order over the CSR incidence arrays.
+    queue[:tail] holds the seeds; visited / is_existential are uint8 flags by
+    variable id (visited is updated in place). Returns the existentials in the
+    order they are reached, stopping once `pending` of them have been found.
+    """
+    order = np.empty(pending, dtype=np.int64)
+    n = 0
+    head = 0
+    while n < pending and head < tail:
+        u = queue[head]
+        head += 1
+        
+        # Collect the unvisited neighbors of u, marking them as they are found
+        start = tail
+        for j in range(var_offsets[u], var_offsets[u + 1]):
+            ci = var_clauses[j]
+            for k in range(clause_offsets[ci], clause_offsets[ci + 1]):
+                v = clause_vars[k]
+                if visited[v] == 0:
+                    visited[v] = 1
+                    queue[tail] = v
+                    tail += 1
+        
+        # Enqueue them in numerical order for determinism
+        queue[start:tail] = np.sort(queue[start:tail])
+        for k in range(start, tail):
+            if is_existential[queue[k]] == 1:
+                order[n] = queue[k]
+                n += 1
+    return order[:n]
+
+def _eval_flat(cube_lits, cube_offsets, clause_lits, clause_offsets, assign):
+    """
+    DNF ^ CNF evaluation over flattened literals.
+    Cube (clause) k spans lits[offsets[k]:offsets[k+1]]; assign[var] is +1 for True, -1 (or 0) for False,
+    so a literal holds iff (lit > 0) == (assign[abs(lit)] > 0) (no branch on the polarity).
+    """
+    # 1. Evaluate DNF part
+    dnf_val = False
+    for k in range(len(cube_offsets) - 1):
+        cube_sat = True
+        for j in range(cube_offsets[k], cube_offsets[k + 1]):
+            lit = cube_lits[j]
+            if (lit > 0) != (assign[abs(lit)] > 0):
+                cube_sat = False
+                break
+        if cube_sat:
+            dnf_val = True
+            break
+    
+    if not dnf_val:
+        return False
+    
+    # 2. Evaluate CNF part
+    for k in range(len(clause_offsets) - 1):
+        clause_sat = False
+        for j in range(clause_offsets[k], clause_offsets[k + 1]):
+            lit = clause_lits[j]
+            if (lit > 0) == (assign[abs(lit)] > 0):
+                clause_sat = True
+                break
+        if not clause_sat:
+            return False
+    
+    return True
+
+if njit is not None:
+    _eval_flat = njit(cache=True)(_eval_flat)
+    _bfs_flat = njit(cache=True)(_bfs_flat)
+
+def dense_assignment(assignment_map, num_vars):
+    """
+    Dense int8 view of a {var: bool} assignment for SymbolicBasis.evaluate:
+    index v holds +1 if v is True and -1 if it is False or missing.
+    The array covers at least the ids 0..num_vars.
+    """
+    dense = np.full(max(num_vars, max(assignment_map, default=0)) + 1, -1, dtype=np.int8)
+    for var, val in assignment_map.items():
+        if val:
+            dense[var] = 1
+    return dense
+
 class SymbolicBasis:
     """
     Represents a boolean function (A or C) that supports both
@@ -130,175 +321,348 @@ class SymbolicBasis:
     """
     def __init__(self, name):
         self.name = name
-        self.cubes = []   # List of list of literals (ANDs) -> ORed together
-        self.clauses = [] # List of list of literals (ORs) -> ANDed together
+        
+        # Struct-of-arrays storage: the literals of all cubes (ANDs, ORed together)
+        # and of all clauses (ORs, ANDed together) are kept contiguously, group k
+        # spanning lits[offsets[k]:offsets[k+1]].
+        self._cube_lits = array('i')
+        self._cube_offsets = array('i', [0])
+        self._clause_lits = array('i')
+        self._clause_offsets = array('i', [0])
+        self._cubes_view = None
+        self._clauses_view = None
+        
+        # Canonical (order-free) form of every stored clause, aligned with the
+        # groups above, plus sets of the cube / clause keys for duplicate rejection
+        self._clause_keys = []
+        self._cube_set = set()
+        self._clause_set = set()
+        # Clauses bucketed by one of their literals (see _index_literal):
+        # {lit: {clause_key: (pos_mask, neg_mask)}}
+        self._clause_index = {}
+        
+        # Bitmask mirror of cubes/clauses used by evaluate(): entry k holds the
+        # positive / negative literals of cube (clause) k as a pair of Python int
+        # bitmasks. Bits are local to the basis ({var: bit}, in order of first use),
+        # so mask width follows the variables used rather than the largest id.
+        self._bits = {}
+        self._max_var = 0
+        self._cube_masks = []
+        self._clause_masks = []
+        
+        # NumPy views of the SoA arrays for the JIT evaluator, dropped before any
+        # change since an array.array cannot grow while it exports its buffer
+        self._flat = None
+        
+        # Bumped on every change; encodings are cached for the current version only
+        self._version = 0
+        self._cnf_cache = {}
+
+    @property
+    def version(self):
+        """Counter incremented whenever the cubes or clauses change."""
+        return self._version
+
+    def _changed(self):
+        self._flat = None
+        self._version += 1
+        self._cnf_cache.clear()
+
+    @property
+    def cubes(self):
+        """List of list of literals (ANDs) -> ORed together. Read-only view."""
+        if self._cubes_view is None:
+            self._cubes_view = self._groups(self._cube_lits, self._cube_offsets)
+        return self._cubes_view
+
+    @property
+    def clauses(self):
+        """List of list of literals (ORs) -> ANDed together. Read-only view."""
+        if self._clauses_view is None:
+            self._clauses_view = self._groups(self._clause_lits, self._clause_offsets)
+        return self._clauses_view
+
+    @staticmethod
+    def _groups(lits, offsets):
+        return [lits[offsets[k]:offsets[k + 1]].tolist() for k in range(len(offsets) - 1)]
+
+    @staticmethod
+    def _iter_groups(lits, offsets):
+        """Yields every group as an array slice of the SoA storage."""
+        for k in range(len(offsets) - 1):
+            yield lits[offsets[k]:offsets[k + 1]]
+
+    @staticmethod
+    def _select_groups(lits, offsets, keep):
+        """Returns new (lits, offsets) arrays holding only the groups flagged in keep."""
+        new_lits = array('i')
+        new_offsets = array('i', [0])
+        for group, k in zip(SymbolicBasis._iter_groups(lits, offsets), keep):
+            if k:
+                new_lits.extend(group)
+                new_offsets.append(len(new_lits))
+        return new_lits, new_offsets
+
+    def _remove_clauses(self, keep):
+        self._changed()
+        self._clause_lits, self._clause_offsets = self._select_groups(self._clause_lits, self._clause_offsets, keep)
+        for k, kept in zip(self._clause_keys, keep):
+            if not kept:
+                del self._clause_index[self._index_literal(k)][k]
+        self._clause_masks = [m for m, kept in zip(self._clause_masks, keep) if kept]
+        self._clause_keys = [k for k, kept in zip(self._clause_keys, keep) if kept]
+        self._clause_set = set(self._clause_keys)
+        self._clauses_view = None
 
     def add_cube(self, lits):
         """
         Expand the function coverage (OR).
         Ensures that existing clauses do not block this new cube by removing conflicting clauses.
+        Exact duplicate cubes are not stored.
         """
         logger.debug(f"[{self.name}] Adding Cube (Expand): {lits}")
         
         # 1. Filter out conflicting clauses
         # A clause C conflicts with cube K if K => !C.
         # This happens if for every lit l in C, -l is in K.
+        # With the cube as a literal set K and its negation -K, that is C ⊆ -K,
+        # unless C also shares a literal with K (a contradictory cube satisfies C).
+        # On the bitmasks: C.pos ⊆ K.neg and C.neg ⊆ K.pos, with no literal
+        # of C in K, i.e. C.pos & (K.pos | ~K.neg) == 0 and C.neg & (K.neg | ~K.pos) == 0.
+        # Since C ⊆ -K, the index literal of C lies in -K: only the buckets of
+        # -K (and of the empty clause) hold candidates.
+        key = frozenset(lits)
+        neg_key = frozenset(-l for l in lits)
+        k_pos, k_neg = self._pack_lits(lits)
+        pos_out, neg_out = k_pos | ~k_neg, k_neg | ~k_pos
+        conflicting = {
+            k
+            for l in neg_key | {0}
+            for k, (c_pos, c_neg) in self._clause_index.get(l, {}).items()
+            if not (c_pos & pos_out or c_neg & neg_out)
+        }
         
-        cube_lit_set = set(lits)
-        non_conflicting_clauses = []
-        removed_count = 0
-        
-        for clause in self.clauses:
-            is_conflicting = True
-            for cl_lit in clause:
-                # If clause literal matches a cube literal, clause is satisfied by cube. No conflict.
-                if cl_lit in cube_lit_set:
-                    is_conflicting = False
-                    break
-                # If clause literal's negation is NOT in cube, then cube doesn't force this lit to False.
-                if -cl_lit not in cube_lit_set:
-                    is_conflicting = False
-                    break
-            
-            if is_conflicting:
-                removed_count += 1
-            else:
-                non_conflicting_clauses.append(clause)
-        
-        if removed_count > 0:
-            logger.debug(f"[{self.name}] Removed {removed_count} conflicting clauses to allow expansion.")
-            self.clauses = non_conflicting_clauses
+        if conflicting:
+            logger.debug(f"[{self.name}] Removed {len(conflicting)} conflicting clauses to allow expansion.")
+            self._remove_clauses([k not in conflicting for k in self._clause_keys])
+
+        # 2. Deduplicate (exact repeats only: tree-path cubes are disjoint, so a
+        # subsumption scan over every stored cube would find nothing)
+        if key in self._cube_set:
+            logger.debug(f"[{self.name}] Cube already in the DNF, not stored.")
+            return
+
+        self._changed()
+        self._cube_set.add(key)
+        self._cube_lits.extend(lits)
+        self._cube_offsets.append(len(self._cube_lits))
+        self._cubes_view = None
+        self._cube_masks.append((k_pos, k_neg))
 
-        self.cubes.append(lits)
+    @staticmethod
+    def _index_literal(clause_key):
+        """The literal a clause is indexed under in _clause_index (0 for the empty clause)."""
+        return min(clause_key, default=0)
 
     def add_clause(self, lits):
-        """Shrink the function coverage (AND)."""
+        """
+        Shrink the function coverage (AND).
+        Duplicate clauses are not stored. (Subsumed clauses are kept: add_cube may
+        later drop the subsuming clause while the weaker one must survive.)
+        """
         logger.debug(f"[{self.name}] Adding Clause (Shrink): {lits}")
-        self.clauses.append(lits)
+        
+        key = frozenset(lits)
+        if key in self._clause_set:
+            logger.debug(f"[{self.name}] Clause already in the CNF, not stored.")
+            return
+        
+        self._changed()
+        self._clause_keys.append(key)
+        self._clause_set.add(key)
+        masks = self._pack_lits(lits)
+        self._clause_index.setdefault(self._index_literal(key), {})[key] = masks
+        self._clause_lits.extend(lits)
+        self._clause_offsets.append(len(self._clause_lits))
+        self._clauses_view = None
+        self._clause_masks.append(masks)
+
+    def _pack_lits(self, lits):
+        """Packs literals into (pos_mask, neg_mask) Python int bitmasks over the local bits."""
+        bits = self._bits
+        pos = neg = 0
+        for l in lits:
+            var = abs(l)
+            bit = bits.get(var)
+            if bit is None:
+                bit = bits[var] = len(bits)
+                self._max_var = max(self._max_var, var)
+            if l > 0:
+                pos |= 1 << bit
+            else:
+                neg |= 1 << bit
+        return pos, neg
+
+    def _pack_assignment(self, assignment_map):
+        """Packs the variables set to True (dict or dense array) into one Python int bitmask over the local bits."""
+        bits = self._bits
+        if isinstance(assignment_map, np.ndarray):
+            # Variables in bit order; ids beyond the array read as False
+            ids = np.fromiter(bits, dtype=np.int64, count=len(bits))
+            true = np.zeros(len(ids), dtype=bool)
+            inside = ids < len(assignment_map)
+            true[inside] = assignment_map[ids[inside]] > 0
+            return int.from_bytes(np.packbits(true, bitorder='little').tobytes(), 'little')
+        
+        # Walk whichever is smaller: the variables of this basis or the dict
+        A = 0
+        if len(bits) < len(assignment_map):
+            for var, bit in bits.items():
+                if assignment_map.get(var):
+                    A |= 1 << bit
+        else:
+            for var, val in assignment_map.items():
+                if val:
+                    bit = bits.get(var)
+                    if bit is not None:
+                        A |= 1 << bit
+        return A
 
     def evaluate(self, assignment_map):
         """
         Eval F(x). Returns True/False.
+        assignment_map: {var: bool} dict, missing variables read as False, or a
+                        dense int8 array indexed by variable id holding +1 for
+                        True and -1 (or 0) for False (see dense_assignment).
+        
+        Dense arrays go to the numba-compiled kernel over the flattened literals when
+        numba is installed. Dicts, and every input without numba, use the bitmask evaluator
+        (building a dense array from a dict would cost more than the bitmask test).
         """
-        # 1. Evaluate DNF part
-        dnf_val = False
-        if not self.cubes:
-            dnf_val = False 
+        if len(self._cube_offsets) == 1:
+            return False
+        
+        if njit is None or not isinstance(assignment_map, np.ndarray):
+            return self._evaluate_masks(self._pack_assignment(assignment_map))
+        
+        if self._flat is None:
+            # Zero-copy views of the SoA storage
+            self._flat = tuple(
+                np.frombuffer(buf, dtype=np.int32)
+                for buf in (self._cube_lits, self._cube_offsets, self._clause_lits, self._clause_offsets)
+            )
+        
+        # The kernel indexes every variable of this basis: a dense input that already
+        # covers them is passed through as-is, a shorter one is padded with False.
+        if len(assignment_map) > self._max_var:
+            assign = assignment_map
         else:
-            for cube in self.cubes:
-                cube_sat = True
-                for lit in cube:
-                    var = abs(lit)
-                    val = assignment_map.get(var, False)
-                    if lit < 0: val = not val
-                    if not val:
-                        cube_sat = False
-                        break
-                if cube_sat:
-                    dnf_val = True
-                    break
+            assign = np.full(self._max_var + 1, -1, dtype=np.int8)
+            assign[:len(assignment_map)] = assignment_map
         
-        if not dnf_val:
-            return False
+        return bool(_eval_flat(*self._flat, assign))
 
-        # 2. Evaluate CNF part
-        for clause in self.clauses:
-            clause_sat = False
-            for lit in clause:
-                var = abs(lit)
-                val = assignment_map.get(var, False)
-                if lit < 0: val = not val
-                if val:
-                    clause_sat = True
-                    break
-            if not clause_sat:
-                return False
+    def _evaluate_masks(self, A):
+        """
+        Bitmask evaluation with the assignment packed as A (missing variables are 0):
+        a cube holds iff A & pos == pos and A & neg == 0,
+        a clause iff A & pos != 0 or ~A & neg != 0.
+        """
+        # 1. Evaluate DNF part
+        if not any(A & pos == pos and not A & neg for pos, neg in self._cube_masks):
+            return False
         
-        return True
+        # 2. Evaluate CNF part
+        return all(A & pos or ~A & neg for pos, neg in self._clause_masks)
 
     def to_cnf(self, start_fresh_var):
         """
         Convert the internal structure to pure CNF clauses for solver encoding.
+        Returns: (clauses, next_fresh_var, final_out) where final_out -> ThisBasis(X).
         """
-        clauses = []
-        curr_var = start_fresh_var
-        
-        # 1. Encode DNF part
-        cube_lits = []
-        for cube in self.cubes:
-            cube_lit = curr_var
-            curr_var += 1
-            cube_lits.append(cube_lit)
-            
-            # cube_lit -> (l1 ^ l2)
-            for l in cube:
-                clauses.append([-cube_lit, l])
-            
-            # (l1 ^ l2) -> cube_lit
-            clauses.append([-l for l in cube] + [cube_lit])
-            
-        dnf_out = curr_var
-        curr_var += 1
-        
-        # dnf_out <-> OR(cube_lits)
-        clauses.append([-dnf_out] + cube_lits)
-        for cl in cube_lits:
-            clauses.append([-cl, dnf_out])
-            
-        if not self.cubes:
-            clauses.append([-dnf_out])
-
-        # 2. Encode CNF part
-        final_out = curr_var
-        curr_var += 1
-        
-        # final_out <-> dnf_out ^ (Cl1) ^ (Cl2)...
-        clauses.append([-final_out, dnf_out])
-        
-        for cl in self.clauses:
-            clauses.append([-final_out] + cl)
-            
-        return clauses, curr_var, final_out
+        return self._cached_encode(start_fresh_var, None)
 
     def get_cnf_constraints(self, out_lit, start_fresh_var):
         """
         Generates clauses that enforce out_lit <-> ThisBasis(X).
+        Returns: (clauses, next_fresh_var)
         """
+        c_list, curr, _ = self._cached_encode(start_fresh_var, out_lit)
+        return c_list, curr
+
+    def _cached_encode(self, start_fresh_var, out_lit):
+        """The encoding is memoized until the basis changes."""
+        key = (out_lit, start_fresh_var)
+        if key not in self._cnf_cache:
+            self._cnf_cache[key] = self._encode(start_fresh_var, out_lit)
+        clauses, curr, final_out = self._cnf_cache[key]
+        return list(clauses), curr, final_out
+
+    def _encode(self, start_fresh_var, out_lit=None):
+        """
+        Tseitin encoding shared by to_cnf (out_lit=None) and get_cnf_constraints.
+        """
+        cubes = self.cubes
+        clauses = self.clauses
+        
+        # Without cubes the basis is False: only the output is constrained, and
+        # no Tseitin variable is allocated besides to_cnf's final_out
+        if not cubes:
+            if out_lit is None:
+                return [[-start_fresh_var]], start_fresh_var + 1, start_fresh_var
+            return [[-out_lit]], start_fresh_var, out_lit
+        
         c_list = []
         curr = start_fresh_var
         
-        # 1. Encode DNF term `d`
-        cube_lits = []
-        for cube in self.cubes:
-            c_lit = curr
-            curr += 1
-            cube_lits.append(c_lit)
-            for l in cube: c_list.append([-c_lit, l])
-            c_list.append([-l for l in cube] + [c_lit])
-            
-        d_lit = curr
-        curr += 1
-        if not cube_lits:
-            c_list.append([-d_lit])
+        # 1. Encode DNF part
+        # Emitted afresh for every start: shifting the fresh ids of a per-version
+        # template costs more than building these clauses again.
+        cube_lits = list(range(curr, curr + len(cubes)))
+        curr += len(cubes)
+        # Plain list comprehensions: for cubes of tree-path length, per-cube NumPy
+        # column_stack / negation followed by tolist() is slower than these.
+        for cube_lit, cube in zip(cube_lits, cubes):
+            # cube_lit -> (l1 ^ l2)
+            neg = -cube_lit
+            c_list += [[neg, l] for l in cube]
+            # (l1 ^ l2) -> cube_lit
+            c_list.append([-l for l in cube] + [cube_lit])
+        
+        # Without clauses the basis is its DNF: out_lit (if given) stands in for dnf_out
+        if not clauses and out_lit is not None:
+            dnf_out = out_lit
         else:
-            c_list.append([-d_lit] + cube_lits)
-            for cl in cube_lits: c_list.append([-cl, d_lit])
-
-        # 2. Link out_lit to d_lit and logical clauses
-        cnf_lits = []
-        for cl in self.clauses:
-            cl_lit = curr
+            dnf_out = curr
             curr += 1
-            cnf_lits.append(cl_lit)
-            
-            c_list.append([-cl_lit] + cl)
-            for l in cl:
-                c_list.append([-l, cl_lit])
         
-        c_list.append([-out_lit, d_lit])
-        for cll in cnf_lits:
-            c_list.append([-out_lit, cll])
+        # dnf_out <-> OR(cube_lits)
+        c_list.append([-dnf_out] + cube_lits)
+        c_list += [[-cl, dnf_out] for cl in cube_lits]
+        
+        # 2. Encode CNF part
+        if not clauses:
+            # No clause wiring: the DNF output is the basis output
+            final_out = dnf_out
+        elif out_lit is None:
+            # final_out -> dnf_out ^ (Cl1) ^ (Cl2)...
+            final_out = curr
+            curr += 1
+            c_list.append([-final_out, dnf_out])
+            neg = -final_out
+            c_list += [[neg] + cl for cl in clauses]
+        else:
+            # cl_lit <-> (Cl), then out_lit <-> dnf_out ^ cl_lit_1 ^ cl_lit_2...
+            final_out = out_lit
+            cnf_lits = list(range(curr, curr + len(clauses)))
+            curr += len(clauses)
+            for cl_lit, cl in zip(cnf_lits, clauses):
+                c_list.append([-cl_lit] + cl)
+                c_list += [[-l, cl_lit] for l in cl]
             
-        c_list.append([-d_lit] + [-x for x in cnf_lits] + [out_lit])
+            c_list.append([-out_lit, dnf_out])
+            neg = -out_lit
+            c_list += [[neg, cll] for cll in cnf_lits]
+            c_list.append([-dnf_out] + [-x for x in cnf_lits] + [out_lit])
         
-        return c_list, curr
\ No newline at end of file
+        return c_list, curr, final_out
\ No newline at end of file